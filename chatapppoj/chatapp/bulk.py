@@ -0,0 +1,70 @@
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from .models import Message
+
+# One message per line: {"conversation": 1, "sender": 2, "content": "...", "timestamp": "..."}
+EXPORT_FIELDS = ('conversation_id', 'sender_id', 'content', 'timestamp')
+
+
+def export_queryset(conversation_ids=None):
+    # Plain tuples in primary key order: no model instances, no per-row joins
+    queryset = Message.objects.order_by('id')
+    if conversation_ids:
+        queryset = queryset.filter(conversation_id__in=conversation_ids)
+    return queryset.values_list(*EXPORT_FIELDS)
+
+
+def to_ndjson(row):
+    conversation_id, sender_id, content, timestamp = row
+    return json.dumps({
+        'conversation': conversation_id,
+        'sender': sender_id,
+        'content': content,
+        'timestamp': timestamp.isoformat(),
+    }, ensure_ascii=False) + '\n'
+
+
+def export_lines(queryset, chunk_size=2000):
+    # iterator() streams from a server-side cursor where the backend has one
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield to_ndjson(row)
+
+
+async def aexport_lines(queryset, chunk_size=2000):
+    # Same cursor as export_lines, pulled one chunk at a time from the DB thread
+    # (aiterator() runs values_list() queries on the event loop)
+    rows = queryset.iterator(chunk_size=chunk_size)
+    next_chunk = sync_to_async(lambda: list(islice(rows, chunk_size)))
+    try:
+        while chunk := await next_chunk():
+            yield ''.join(to_ndjson(row) for row in chunk)
+    finally:
+        await sync_to_async(rows.close)()
+
+
+def parse_lines(lines, conversation_id=None):
+    for line in lines:
+        if not line.strip():
+            continue
+        data = json.loads(line)
+        yield Message(
+            conversation_id=conversation_id or data['conversation'],
+            sender_id=data['sender'],
+            content=data['content'],
+            timestamp=parse_datetime(data['timestamp']),
+        )
+
+
+def import_lines(lines, batch_size=5000, conversation_id=None):
+    messages = parse_lines(lines, conversation_id)
+    imported = 0
+    with transaction.atomic():
+        while batch := list(islice(messages, batch_size)):
+            Message.objects.bulk_create(batch, batch_size=batch_size)
+            imported += len(batch)
+    return imported
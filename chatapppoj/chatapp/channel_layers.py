@@ -0,0 +1,81 @@
+import asyncio
+import bisect
+import hashlib
+
+from channels_redis.core import RedisChannelLayer
+from channels_redis.pubsub import RedisPubSubChannelLayer, RedisPubSubLoopLayer
+from channels_redis.utils import _wrap_close
+
+
+def _ring_hash(value):
+    digest = hashlib.md5(value.encode('utf8'), usedforsecurity=False).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+def _host_key(host):
+    # Ring positions come from the host itself, not its place in the list,
+    # so adding or removing a host leaves the others where they are
+    if 'address' in host:
+        return str(host['address'])
+    return repr(sorted((key, str(value)) for key, value in host.items()))
+
+
+#  Consistent hash ring over the shard list, with virtual nodes per shard.
+#  Adding a shard to N moves about 1/(N+1) of the names; removing one only moves its own.
+class HashRing:
+    def __init__(self, nodes, replicas=160):
+        self.size = len(nodes)
+        points = sorted(
+            (_ring_hash(f"{node}#{replica}"), index)
+            for index, node in enumerate(nodes)
+            for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._indexes = [index for _, index in points]
+
+    def get(self, name):
+        if self.size == 1:
+            return 0
+        position = bisect.bisect(self._hashes, _ring_hash(name)) % len(self._hashes)
+        return self._indexes[position]
+
+
+#  channels_redis core layer with groups and channels placed on the hash ring
+class RingRedisChannelLayer(RedisChannelLayer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ring = HashRing([_host_key(host) for host in self.hosts])
+
+    def consistent_hash(self, value):
+        if isinstance(value, bytes):
+            value = value.decode('utf8')
+        return self.ring.get(value)
+
+
+class RingRedisPubSubLoopLayer(RedisPubSubLoopLayer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ring = HashRing([_host_key(shard.host) for shard in self._shards])
+
+    def _get_shard(self, channel_or_group_name):
+        return self._shards[self.ring.get(channel_or_group_name)]
+
+
+#  channels_redis pub/sub layer with groups and channels placed on the hash ring
+class RingRedisPubSubChannelLayer(RedisPubSubChannelLayer):
+    def _get_layer(self):
+        # Same as the parent, with the ring loop layer
+        loop = asyncio.get_running_loop()
+
+        try:
+            layer = self._layers[loop]
+        except KeyError:
+            layer = RingRedisPubSubLoopLayer(
+                *self._args,
+                **self._kwargs,
+                channel_layer=self,
+            )
+            self._layers[loop] = layer
+            _wrap_close(self, loop)
+
+        return layer
@@ -5,12 +5,20 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from .models import Conversation, Message
+from . import draining
 from urllib.parse import parse_qs
 
 User = get_user_model()
 
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
+        # Worker is draining: send the client elsewhere before doing any work
+        if draining.is_draining():
+            await self.accept()
+            await self.send_reconnect(draining.reconnect_delay())
+            await self.close(code=draining.DRAIN_CLOSE_CODE)
+            return
+
         # Parse JWT token from query string
         query_string = self.scope['query_string'].decode('utf-8')
         params = parse_qs(query_string)
@@ -38,6 +46,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
         # Add channel to group
         await self.channel_layer.group_add(self.room_group_name, self.channel_name)
         await self.accept()
+        draining.register(self)
 
         # Notify online status
         user_data = await self.get_user_data(self.user)
@@ -51,16 +60,19 @@ class ChatConsumer(AsyncWebsocketConsumer):
         )
 
     async def disconnect(self, close_code):
+        draining.unregister(self)
         if hasattr(self, 'room_group_name'):
-            user_data = await self.get_user_data(self.user)
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'online_status',
-                    'online_users': [user_data],
-                    'status': 'offline'
-                }
-            )
+            # A handed-over socket already announced 'reconnecting' in hand_over()
+            if not getattr(self, 'handed_over', False):
+                user_data = await self.get_user_data(self.user)
+                await self.channel_layer.group_send(
+                    self.room_group_name,
+                    {
+                        'type': 'online_status',
+                        'online_users': [user_data],
+                        'status': 'offline'
+                    }
+                )
             await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
 
     async def receive(self, text_data):
@@ -80,18 +92,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 from .serializers import UserListSerializer
                 user_data = UserListSerializer(user).data
 
-                # Save message
-                message = await self.save_message(conversation, user, message_content)
-
-                # Broadcast
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    {
-                        'type': 'chat_message',
-                        'message': message.content,
-                        'user': user_data,
-                        'timestamp': message.timestamp.isoformat(),
-                    }
+                # Save and broadcast (flushed before the worker drains)
+                await draining.track_write(
+                    self.save_and_broadcast(conversation, user, user_data, message_content)
                 )
             except Exception as e:
                 print(f"Error: {e}")
@@ -113,6 +116,44 @@ class ChatConsumer(AsyncWebsocketConsumer):
             except Exception as e:
                 print(f"Typing event error: {e}")
 
+    async def save_and_broadcast(self, conversation, user, user_data, message_content):
+        # Save message
+        message = await self.save_message(conversation, user, message_content)
+
+        # Broadcast
+        await self.channel_layer.group_send(
+            self.room_group_name,
+            {
+                'type': 'chat_message',
+                'message': message.content,
+                'user': user_data,
+                'timestamp': message.timestamp.isoformat(),
+            }
+        )
+
+    # Draining
+    async def hand_over(self, delay_ms):
+        self.handed_over = True
+
+        # Sent now rather than from disconnect(): the worker may exit before the close handshake ends.
+        # Peers keep the user online for the grace window instead of flapping offline.
+        user_data = await self.get_user_data(self.user)
+        await self.channel_layer.group_send(
+            self.room_group_name,
+            {
+                'type': 'online_status',
+                'online_users': [user_data],
+                'status': 'reconnecting',
+                'grace_ms': settings.PRESENCE_HANDOVER_GRACE_MS,
+            }
+        )
+
+        await self.send_reconnect(delay_ms)
+        await self.close(code=draining.DRAIN_CLOSE_CODE)
+
+    async def send_reconnect(self, delay_ms):
+        await self.send(text_data=json.dumps({'type': 'reconnect', 'delay_ms': delay_ms}))
+
     # Event handlers
     async def chat_message(self, event):
         await self.send(text_data=json.dumps(event))
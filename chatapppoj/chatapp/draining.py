@@ -0,0 +1,100 @@
+import asyncio
+import os
+import random
+import signal
+import weakref
+
+from django.conf import settings
+
+# Close code telling clients the worker is going away and they should reconnect
+DRAIN_CLOSE_CODE = 4002
+
+_consumers = weakref.WeakSet()
+_pending_writes = set()
+_draining = False
+# Kept so the running drain isn't garbage collected mid-way
+_drain_task = None
+
+
+def is_draining():
+    return _draining
+
+
+def register(consumer):
+    _consumers.add(consumer)
+
+
+def unregister(consumer):
+    _consumers.discard(consumer)
+
+
+def reconnect_delay():
+    # Spread reconnects so the next worker doesn't get every socket at once
+    return random.randint(0, settings.DRAIN_RECONNECT_JITTER_MS)
+
+
+async def track_write(coro):
+    # Shielded so a socket closed mid-write still gets its message saved and broadcast
+    task = asyncio.ensure_future(coro)
+    _pending_writes.add(task)
+    task.add_done_callback(_pending_writes.discard)
+    return await asyncio.shield(task)
+
+
+def install_signal_handler():
+    # Called once at worker startup (chatapppoj.asgi), so a worker with no sockets yet can be drained too
+    sig = getattr(signal, settings.DRAIN_SIGNAL, None)
+    if sig is None:
+        return
+
+    try:
+        signal.signal(sig, _on_signal)
+    except ValueError:
+        # Not on the main thread: the worker can't be drained by signal
+        pass
+
+
+def _on_signal(signum, frame):
+    global _draining
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # Server loop not started yet: there are no sockets to hand over
+        _draining = True
+        if settings.DRAIN_EXIT:
+            os.kill(os.getpid(), signal.SIGTERM)
+        return
+    loop.call_soon_threadsafe(start_drain)
+
+
+def start_drain():
+    global _draining, _drain_task
+    if _draining:
+        return
+    _draining = True
+    _drain_task = asyncio.ensure_future(drain())
+
+
+async def drain():
+    timeout = settings.DRAIN_FLUSH_TIMEOUT
+
+    # Let in-flight messages reach the DB and the group before the sockets go
+    if _pending_writes:
+        await asyncio.wait(set(_pending_writes), timeout=timeout)
+
+    await asyncio.gather(
+        *(consumer.hand_over(reconnect_delay()) for consumer in list(_consumers)),
+        return_exceptions=True,
+    )
+
+    if _pending_writes:
+        await asyncio.wait(set(_pending_writes), timeout=timeout)
+
+    # Give the sockets time to finish the close handshake (disconnect() unregisters them)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.DRAIN_CLOSE_TIMEOUT
+    while _consumers and loop.time() < deadline:
+        await asyncio.sleep(0.1)
+
+    if settings.DRAIN_EXIT:
+        os.kill(os.getpid(), signal.SIGTERM)
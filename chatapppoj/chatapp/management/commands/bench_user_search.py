@@ -0,0 +1,109 @@
+import statistics
+import string
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from chatapp.pagination import UserCursorPagination
+from chatapp.views import UserListView
+
+
+class Rollback(Exception):
+    pass
+
+
+def bench_username(i):
+    # Leading letter cycles a-z in mixed case, so a one-letter prefix matches 1/26 of the table
+    letter = string.ascii_lowercase[i % 26]
+    if (i // 26) % 2:
+        letter = letter.upper()
+    return f'{letter}-bench-{i:07d}'
+
+
+#  Times the user directory search at growing table sizes.
+#  Each search prefix matches a fixed share of the table, so its match count grows with
+#  the table while the response should stay one page read.
+#  Everything runs inside a transaction that is rolled back, so the DB is left untouched.
+class Command(BaseCommand):
+    help = "Benchmark UserListView response time against the total number of users"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000',
+                            help='Comma separated user counts to benchmark')
+        parser.add_argument('--repeat', type=int, default=50,
+                            help='Requests per query at each size')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        try:
+            with transaction.atomic():
+                self.run(sizes, options['repeat'], options['batch_size'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, sizes, repeat, batch_size):
+        view = UserListView.as_view()
+        factory = APIRequestFactory()
+        requester = User.objects.create(username='~bench-requester')
+        page_size = UserCursorPagination.page_size
+        queries = {
+            'first page': {},
+            'search=b': {'search': 'b'},
+            'search=B-bench-0': {'search': 'B-bench-0'},
+            'search=b fields=id': {'search': 'b', 'fields': 'id'},
+            'search=b page 2': {'search': 'b', 'page': 2},
+        }
+
+        created = 0
+        self.stdout.write(f"{'users':>10}  " + "  ".join(f"{name:>22}" for name in queries))
+        for size in sizes:
+            users = (
+                User(username=bench_username(i), password='!')
+                for i in range(created, size)
+            )
+            User.objects.bulk_create(users, batch_size=batch_size)
+            created = size
+            # Users whose name starts with b/B (i % 26 == 1)
+            share = (size + 24) // 26
+
+            cells = []
+            for params in queries.values():
+                params = dict(params)
+                page = params.pop('page', 1)
+                # Rows this page must return: a search matches every bench user with that letter
+                matching = share if 'search' in params else User.objects.count()
+                expected = min(page_size, max(matching - (page - 1) * page_size, 0))
+                if not expected:
+                    cells.append("no such page")
+                    continue
+
+                samples = []
+                for _ in range(repeat):
+                    response, elapsed = self.get(view, factory, requester, params, page)
+                    samples.append(elapsed)
+
+                rows = len(response.data['results'])
+                if rows != expected:
+                    raise CommandError(f"{params} page {page} returned {rows} rows, expected {expected}")
+                cells.append(f"{statistics.median(samples):8.2f} ms ({rows:>3} rows)")
+
+            self.stdout.write(f"{size:>10}  " + "  ".join(f"{cell:>22}" for cell in cells))
+
+    def get(self, view, factory, requester, params, page):
+        request = factory.get('/chat/users/', params, HTTP_HOST='localhost')
+        force_authenticate(request, user=requester)
+        if page == 2:
+            # Page 2: follow the cursor of page 1 (untimed), then time the second request
+            response = view(request)
+            request = factory.get(response.data['next'], HTTP_HOST='localhost')
+            force_authenticate(request, user=requester)
+
+        start = time.perf_counter()
+        response = view(request)
+        response.render()
+        return response, (time.perf_counter() - start) * 1000
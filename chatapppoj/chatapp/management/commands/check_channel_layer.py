@@ -0,0 +1,100 @@
+import asyncio
+import random
+import time
+from collections import Counter
+
+from channels.layers import DEFAULT_CHANNEL_LAYER, InMemoryChannelLayer, channel_layers
+from django.core.management.base import BaseCommand, CommandError
+
+
+def shard_index(layer, group):
+    # RedisChannelLayer hashes onto its host list, the pub/sub layer onto its shard list
+    # (a hash ring for the chatapp.channel_layers backends)
+    if hasattr(layer, 'consistent_hash'):
+        return layer.consistent_hash(group)
+    if hasattr(layer, '_get_shard'):
+        return layer._shards.index(layer._get_shard(group))
+    return 0
+
+
+#  Simulates N Daphne workers sharing the configured channel layer.
+#  Each worker gets its own layer instance (own connections, client prefix and receive loop),
+#  like separate processes would. Every conversation gets one socket per participant on a
+#  random worker, a message is sent to the chat_<id> group from another random worker and
+#  each socket must receive it through its own worker's layer.
+class Command(BaseCommand):
+    help = "Check cross-worker group fan-out and shard distribution of the configured channel layer"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--conversations', type=int, default=200)
+        parser.add_argument('--timeout', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        if options['workers'] < 2:
+            raise CommandError("Use at least 2 workers to check delivery between them")
+        asyncio.run(self.run(options['workers'], options['conversations'], options['timeout']))
+
+    async def run(self, workers, conversations, timeout):
+        layers = [channel_layers.make_backend(DEFAULT_CHANNEL_LAYER) for _ in range(workers)]
+        if isinstance(layers[0], InMemoryChannelLayer):
+            raise CommandError(
+                "The in-memory layer only exists inside one process and cannot connect workers; "
+                "use CHANNEL_LAYER=redis or pubsub"
+            )
+
+        sockets = []
+        try:
+            for conversation_id in range(conversations):
+                group = f"chat_{conversation_id}"
+                for _ in range(2):
+                    worker = random.randrange(workers)
+                    channel = await layers[worker].new_channel()
+                    await layers[worker].group_add(group, channel)
+                    sockets.append((worker, group, channel))
+
+            start = time.perf_counter()
+            senders = {}
+            for conversation_id in range(conversations):
+                group = f"chat_{conversation_id}"
+                senders[group] = random.randrange(workers)
+                await layers[senders[group]].group_send(group, {
+                    'type': 'chat_message',
+                    'message': f"hello {conversation_id}",
+                })
+
+            missing = 0
+            cross_worker = 0
+            for worker, group, channel in sockets:
+                try:
+                    await asyncio.wait_for(layers[worker].receive(channel), timeout)
+                except asyncio.TimeoutError:
+                    missing += 1
+                else:
+                    cross_worker += worker != senders[group]
+            elapsed = time.perf_counter() - start
+
+            for worker, group, channel in sockets:
+                await layers[worker].group_discard(group, channel)
+
+            shards = Counter(shard_index(layers[0], f"chat_{i}") for i in range(conversations))
+        finally:
+            for layer in layers:
+                if hasattr(layer, 'close_pools'):
+                    # Core layer: close connections only, flush() would delete shared data
+                    await layer.close_pools()
+                elif hasattr(layer, '_get_shard'):
+                    # Pub/sub layer: flush() just drops this instance's subscriptions and connections
+                    await layer.flush()
+
+        self.stdout.write(f"Layer: {type(layers[0]).__module__}.{type(layers[0]).__name__}")
+        self.stdout.write(
+            f"Workers: {workers}, sockets: {len(sockets)}, "
+            f"delivered across workers: {cross_worker}, fan-out time: {elapsed * 1000:.1f} ms"
+        )
+        for index, count in sorted(shards.items()):
+            self.stdout.write(f"  shard {index}: {count} conversation groups")
+
+        if missing:
+            raise CommandError(f"{missing} of {len(sockets)} sockets did not receive their message")
+        self.stdout.write(self.style.SUCCESS("All sockets received their conversation message"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from chatapp.bulk import export_lines, export_queryset
+
+
+#  Streams messages as NDJSON (one JSON object per line) with constant memory
+class Command(BaseCommand):
+    help = "Export messages as NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conversation', type=int, action='append', dest='conversations',
+                            help='Conversation id to export (repeatable, default: all)')
+        parser.add_argument('--output', help='File to write to (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        queryset = export_queryset(options['conversations'])
+        lines = export_lines(queryset, chunk_size=options['chunk_size'])
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
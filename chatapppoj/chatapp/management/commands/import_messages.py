@@ -0,0 +1,38 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from chatapp.bulk import import_lines
+
+
+#  Loads an NDJSON export with batched bulk_create inside a single transaction
+class Command(BaseCommand):
+    help = "Import messages from NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--input', help='File to read from (default: stdin)')
+        parser.add_argument('--conversation', type=int,
+                            help='Import every message into this conversation instead of the exported one')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        if options['input']:
+            with open(options['input'], encoding='utf-8') as lines:
+                imported = self.load(lines, options)
+        else:
+            imported = self.load(sys.stdin, options)
+        elapsed = time.perf_counter() - start
+
+        self.stderr.write(self.style.SUCCESS(
+            f"Imported {imported} messages in {elapsed:.1f}s "
+            f"({imported / max(elapsed, 1e-9) * 60:,.0f} messages/minute)"
+        ))
+
+    def load(self, lines, options):
+        return import_lines(
+            lines,
+            batch_size=options['batch_size'],
+            conversation_id=options['conversation'],
+        )
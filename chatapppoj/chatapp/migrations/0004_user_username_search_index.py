@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+# Index for the user directory: LOWER(username), id is both the search range and the
+# cursor order (see chatapp.pagination.username_key), so pages are plain index reads.
+# PostgreSQL compares the key with COLLATE "C" so a prefix maps to one index range.
+# Other backends run the same query without a dedicated index.
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS chatapp_user_username_key '
+            'ON auth_user ((LOWER(username)) COLLATE "C", id)'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS chatapp_user_username_key '
+            'ON auth_user (LOWER(username), id)'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        schema_editor.execute('DROP INDEX IF EXISTS chatapp_user_username_key')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatapp', '0003_rename_converstaion_message_conversation_and_more'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
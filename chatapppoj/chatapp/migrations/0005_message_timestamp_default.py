@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:25
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatapp', '0004_user_username_search_index'),
+    ]
+
+    # auto_now_add -> default=timezone.now only changes how Django fills the value.
+    # The column is identical, so skip the table rebuild SQLite would do for AlterField.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='message',
+                    name='timestamp',
+                    field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+                ),
+            ],
+        ),
+    ]
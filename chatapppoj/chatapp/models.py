@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.db.models import Prefetch 
+from django.utils import timezone
 
 class ConversationManager(models.Manager):
     def get_queryset(self):
@@ -20,7 +21,8 @@ class Message(models.Model):
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='messages')
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     content = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # default rather than auto_now_add, so bulk imports can keep the original timestamps
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
 
     def __str__(self):
         return f"Message from {self.sender.username} in {self.content[:20]}"
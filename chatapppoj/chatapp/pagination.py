@@ -0,0 +1,21 @@
+from django.db import connection
+from django.db.models.functions import Collate, Lower
+from rest_framework.pagination import CursorPagination
+
+
+#  Case-folded sort/search key for usernames.
+#  Migration 0004 indexes this exact expression (plus id), so a search and its cursor
+#  pages are read in index order without sorting the matches.
+def username_key():
+    if connection.vendor == 'postgresql':
+        # Byte order, so a prefix is one contiguous range of the index
+        return Collate(Lower('username'), 'C')
+    return Lower('username')
+
+
+#  Cursor pagination for the user directory (expects the username_key annotation)
+class UserCursorPagination(CursorPagination):
+    ordering = ('username_key', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
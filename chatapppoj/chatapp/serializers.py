@@ -22,6 +22,15 @@ class UserListSerializer(serializers.ModelSerializer):
         model = User
         fields = ('id', 'username')
 
+    def __init__(self, *args, **kwargs):
+        # Optional `fields` kwarg limits the payload to a subset of Meta.fields
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
 
 #  Serializer for conversations
 class ConversationSerializer(serializers.ModelSerializer):
@@ -1,3 +1,401 @@
-from django.test import TestCase
+import asyncio
+import os
+import signal
+import threading
+import unittest
+import warnings
+from collections import Counter
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import AsyncClient, Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from chatapppoj.asgi import application
+from . import draining
+from .consumers import ChatConsumer
+from .bulk import export_lines, export_queryset, import_lines
+from .channel_layers import HashRing, RingRedisChannelLayer, RingRedisPubSubChannelLayer
+from .models import Conversation, Message
+
+try:
+    import fakeredis
+    import lupa  # noqa: F401 (fakeredis needs it for the core layer's Lua scripts)
+except ImportError:
+    fakeredis = None
+
+
+class UserListViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='alice')
+        for username in ('Mike', 'mila', 'molly', 'nora'):
+            User.objects.create(username=username)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('user-list')
+
+    def usernames(self, response):
+        return [user['username'] for user in response.data['results']]
+
+    def test_requires_authentication(self):
+        response = APIClient().get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+    def test_search_is_case_insensitive_prefix(self):
+        for search in ('m', 'M'):
+            response = self.client.get(self.url, {'search': search})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(sorted(self.usernames(response)), ['Mike', 'mila', 'molly'])
+
+        response = self.client.get(self.url, {'search': 'ill'})
+        self.assertEqual(self.usernames(response), [])
+
+    def test_fields_limits_payload(self):
+        response = self.client.get(self.url, {'fields': 'id'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['results'][0]), {'id'})
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(self.url, {'fields': 'password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.data)
+
+    def test_cursor_pages_cover_every_user_once(self):
+        seen = []
+        response = self.client.get(self.url, {'page_size': 2})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen.extend(self.usernames(response))
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(sorted(seen), sorted(User.objects.values_list('username', flat=True)))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_search_pages_are_in_case_insensitive_order(self):
+        seen = []
+        response = self.client.get(self.url, {'search': 'M', 'page_size': 1})
+        while True:
+            seen.extend(self.usernames(response))
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(seen, ['Mike', 'mila', 'molly'])
+
+
+class HashRingTests(SimpleTestCase):
+    names = [f"chat_{i}" for i in range(10000)]
+
+    def hosts(self, count):
+        return [f"redis://10.0.0.{i}:6379" for i in range(count)]
+
+    def placement(self, hosts):
+        ring = HashRing(hosts)
+        return {name: hosts[ring.get(name)] for name in self.names}
+
+    def test_adding_a_shard_moves_about_one_in_n(self):
+        before = self.placement(self.hosts(4))
+        after = self.placement(self.hosts(5))
+
+        moved = [name for name in self.names if before[name] != after[name]]
+        # 1/5 of the names move, and only onto the new shard
+        self.assertAlmostEqual(len(moved) / len(self.names), 1 / 5, delta=0.05)
+        self.assertEqual({after[name] for name in moved}, {self.hosts(5)[-1]})
+
+    def test_removing_a_shard_only_moves_its_names(self):
+        before = self.placement(self.hosts(5))
+        removed = self.hosts(5)[2]
+        after = self.placement([host for host in self.hosts(5) if host != removed])
+
+        moved = {name for name in self.names if before[name] != after[name]}
+        self.assertEqual(moved, {name for name in self.names if before[name] == removed})
+
+    def test_shards_get_an_even_share(self):
+        counts = list(Counter(self.placement(self.hosts(4)).values()).values())
+        self.assertLess(max(counts) / min(counts), 1.35)
+
+    def test_layers_place_names_on_the_ring(self):
+        hosts = self.hosts(4)
+        core = RingRedisChannelLayer(hosts=hosts)
+        pubsub = RingRedisPubSubChannelLayer(hosts=hosts)
+
+        async def pubsub_shard(name):
+            return pubsub._get_layer()._get_shard(name).host['address']
+
+        async def placements():
+            try:
+                return [
+                    (core.hosts[core.consistent_hash(name)]['address'], await pubsub_shard(name))
+                    for name in self.names[:200]
+                ]
+            finally:
+                await pubsub.flush()
+
+        expected = self.placement(hosts)
+        for name, (core_host, pubsub_host) in zip(self.names, asyncio.run(placements())):
+            self.assertEqual(core_host, expected[name])
+            self.assertEqual(pubsub_host, expected[name])
+
+
+@unittest.skipUnless(fakeredis, "needs fakeredis and lupa")
+class ChannelLayerScalingTests(SimpleTestCase):
+    shard_count = 3
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servers = []
+        for _ in range(cls.shard_count):
+            server = fakeredis.TcpFakeServer(('127.0.0.1', 0), server_type='redis')
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            cls.servers.append(server)
+        cls.hosts = [f"redis://127.0.0.1:{server.server_address[1]}" for server in cls.servers]
+
+    @classmethod
+    def tearDownClass(cls):
+        for server in cls.servers:
+            server.shutdown()
+            server.server_close()
+        super().tearDownClass()
+
+    def check(self, backend):
+        layers = {'default': {'BACKEND': backend, 'CONFIG': {'hosts': self.hosts}}}
+        out = StringIO()
+        with override_settings(CHANNEL_LAYERS=layers):
+            call_command('check_channel_layer', workers=4, conversations=60, stdout=out)
+        return out.getvalue()
+
+    def assertFanOutAcrossShards(self, output):
+        self.assertIn("All sockets received their conversation message", output)
+        self.assertIn("Workers: 4, sockets: 120", output)
+        self.assertNotIn("delivered across workers: 0,", output)
+        for index in range(self.shard_count):
+            self.assertIn(f"shard {index}:", output)
+
+    def test_core_layer_across_workers(self):
+        output = self.check('chatapp.channel_layers.RingRedisChannelLayer')
+        self.assertIn("RingRedisChannelLayer", output)
+        self.assertFanOutAcrossShards(output)
+
+    def test_pubsub_layer_across_workers(self):
+        output = self.check('chatapp.channel_layers.RingRedisPubSubChannelLayer')
+        self.assertIn("RingRedisPubSubChannelLayer", output)
+        self.assertFanOutAcrossShards(output)
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    DRAIN_EXIT=False,
+    DRAIN_RECONNECT_JITTER_MS=100,
+    DRAIN_CLOSE_TIMEOUT=5,
+)
+class DrainingTests(TransactionTestCase):
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.set([self.alice, self.bob])
+
+    def tearDown(self):
+        draining._draining = False
+        draining._drain_task = None
+
+    def communicator(self, user):
+        token = AccessToken.for_user(user)
+        return WebsocketCommunicator(application, f"/ws/chat/{self.conversation.id}/?token={token}")
+
+    async def test_draining_worker_turns_away_new_sockets(self):
+        draining._draining = True
+        communicator = self.communicator(self.alice)
+
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        message = await communicator.receive_json_from()
+        self.assertEqual(message['type'], 'reconnect')
+        self.assertLessEqual(message['delay_ms'], 100)
+        closed = await communicator.receive_output()
+        self.assertEqual(closed, {'type': 'websocket.close', 'code': draining.DRAIN_CLOSE_CODE})
+
+    async def test_drain_hands_over_open_sockets(self):
+        alice = self.communicator(self.alice)
+        bob = self.communicator(self.bob)
+        await alice.connect()
+        await alice.receive_json_from()
+        await bob.connect()
+        await bob.receive_json_from()
+        await alice.receive_json_from()
+
+        # Bob's socket plays a peer held by another worker: it is not drained
+        for consumer in list(draining._consumers):
+            if consumer.user.id == self.bob.id:
+                draining.unregister(consumer)
+
+        draining._draining = True
+        drain = asyncio.ensure_future(draining.drain())
+
+        message = await alice.receive_json_from()
+        self.assertEqual(message['type'], 'reconnect')
+        closed = await alice.receive_output()
+        self.assertEqual(closed, {'type': 'websocket.close', 'code': draining.DRAIN_CLOSE_CODE})
+
+        # The peer hears 'reconnecting' before the socket closes, never 'offline'
+        presence = await bob.receive_json_from()
+        self.assertEqual(presence['status'], 'reconnecting')
+        self.assertEqual(presence['online_users'][0]['id'], self.alice.id)
+
+        # Drain waits for the close handshake before it finishes
+        self.assertFalse(drain.done())
+        await alice.disconnect()
+        await asyncio.wait_for(drain, 2)
+        self.assertTrue(await bob.receive_nothing())
+        await bob.disconnect()
+
+    async def test_drain_flushes_write_in_flight_before_closing(self):
+        alice = self.communicator(self.alice)
+        bob = self.communicator(self.bob)
+        await alice.connect()
+        await alice.receive_json_from()
+        await bob.connect()
+        await bob.receive_json_from()
+        await alice.receive_json_from()
+        for consumer in list(draining._consumers):
+            if consumer.user.id == self.bob.id:
+                draining.unregister(consumer)
+
+        # Hold the message save until the drain has started
+        saved = asyncio.Event()
+        save_message = ChatConsumer.__dict__['save_message']
+
+        async def slow_save_message(consumer, conversation, user, content):
+            await saved.wait()
+            return await save_message(consumer, conversation, user, content)
+
+        with mock.patch.object(ChatConsumer, 'save_message', slow_save_message):
+            await alice.send_json_to({'type': 'chat_message', 'message': 'last words', 'user': self.alice.id})
+            while not draining._pending_writes:
+                await asyncio.sleep(0.01)
+
+            draining.start_drain()
+            self.assertTrue(await alice.receive_nothing(0.3))
+            saved.set()
+
+            # alice only closes once the message is stored
+            while True:
+                output = await alice.receive_output()
+                if output['type'] == 'websocket.close':
+                    break
+            stored = await Message.objects.filter(content='last words', sender=self.alice).aexists()
+            self.assertTrue(stored)
+
+        # ...and broadcast: the peer gets it before the handover
+        message = await bob.receive_json_from()
+        self.assertEqual(message['type'], 'chat_message')
+        self.assertEqual(message['message'], 'last words')
+        presence = await bob.receive_json_from()
+        self.assertEqual(presence['status'], 'reconnecting')
+
+        await alice.disconnect()
+        await asyncio.wait_for(draining._drain_task, 2)
+        await bob.disconnect()
+
+    def test_signal_handler_is_installed_at_startup(self):
+        # Installed when chatapppoj.asgi is imported, before any socket connects
+        self.assertIs(signal.getsignal(signal.SIGUSR1), draining._on_signal)
+
+        async def worker():
+            os.kill(os.getpid(), signal.SIGUSR1)
+            while draining._drain_task is None:
+                await asyncio.sleep(0.01)
+            await asyncio.wait_for(draining._drain_task, 2)
+
+        asyncio.run(worker())
+        self.assertTrue(draining.is_draining())
+
+
+class MessageExportImportTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.set([self.alice, self.bob])
+
+        sent_at = timezone.now() - timedelta(days=30)
+        for i, sender in enumerate([self.alice, self.bob, self.alice]):
+            Message.objects.create(
+                conversation=self.conversation,
+                sender=sender,
+                content=f"message {i} ✓",
+                timestamp=sent_at + timedelta(minutes=i),
+            )
+        self.url = reverse('message_export', kwargs={'conversation_id': self.conversation.id})
+
+    def rows(self):
+        return list(export_queryset([self.conversation.id]))
+
+    def test_round_trip_keeps_messages_and_timestamps(self):
+        exported = self.rows()
+        lines = list(export_lines(export_queryset([self.conversation.id]), chunk_size=2))
+        self.assertEqual(len(lines), 3)
+
+        Message.objects.all().delete()
+        imported = import_lines(lines, batch_size=2)
+
+        self.assertEqual(imported, 3)
+        self.assertEqual(self.rows(), exported)
+
+    def test_import_into_another_conversation(self):
+        lines = list(export_lines(export_queryset([self.conversation.id])))
+        other = Conversation.objects.create()
+
+        import_lines(lines, conversation_id=other.id)
+
+        self.assertEqual(other.messages.count(), 3)
+
+    def test_export_requires_participant(self):
+        outsider = User.objects.create(username='mallory')
+        client = APIClient()
+        client.force_authenticate(user=outsider)
+
+        response = client.get(self.url)
+
+        self.assertEqual(response.status_code, 403)
+
+    async def test_export_streams_ndjson(self):
+        token = AccessToken.for_user(self.alice)
+        response = await AsyncClient().get(self.url, headers={'Authorization': f'Bearer {token}'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(len(body.splitlines()), 3)
+        self.assertIn('message 2 ✓', body)
+
+    def test_export_streams_ndjson_under_wsgi(self):
+        token = AccessToken.for_user(self.alice)
+        with warnings.catch_warnings():
+            # Django warns when it has to buffer an async iterator for a sync handler
+            warnings.simplefilter('error')
+            response = Client().get(self.url, headers={'Authorization': f'Bearer {token}'})
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(response.is_async)
+            body = b''.join(response.streaming_content).decode()
+
+        self.assertEqual(len(body.splitlines()), 3)
+
+    def test_export_command_writes_to_command_stdout(self):
+        out = StringIO()
+        call_command('export_messages', conversations=[self.conversation.id], stdout=out)
+
+        lines = out.getvalue().splitlines(keepends=True)
+        self.assertEqual(lines, list(export_lines(export_queryset([self.conversation.id]))))
@@ -11,6 +11,7 @@ urlpatterns = [
     path('conversations/',ConversationListCreateView.as_view(),name='conversation_list'),
     path('conversations/<int:conversation_id>/messages/',MessageListCreatView.as_view(),name='message_list_create'),
     path('conversations/<int:conversation_id>/messages/<int:pk>/',MessageRetrieveDestroyView.as_view(),name='message_detail_destroy'),
+    path('conversations/<int:conversation_id>/messages/export/',MessageExportView.as_view(),name='message_export'),
     
 
 ]
\ No newline at end of file
@@ -1,10 +1,14 @@
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth.models import User
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from .bulk import aexport_lines, export_lines, export_queryset
 from .models import Conversation, Message
+from .pagination import UserCursorPagination, username_key
 from .serializers import (
     UserSerializer,
     UserListSerializer,
@@ -22,12 +26,40 @@ class CreateUserView(generics.CreateAPIView):
 
 
 # ------------------------------
-# 🔹 List all users (for logged-in users)
+# 🔹 Search the user directory (for logged-in users)
+#    ?search=<prefix>  typeahead on username
+#    ?fields=id,username  limit the payload
+#    ?cursor=...  next / previous page
 # ------------------------------
 class UserListView(generics.ListAPIView):
-    queryset = User.objects.all()
     serializer_class = UserListSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = UserCursorPagination
+
+    def get_queryset(self):
+        # username is always loaded and username_key annotated: the cursor is built from it
+        queryset = User.objects.only("id", "username").annotate(username_key=username_key())
+        search = self.request.query_params.get("search", "").strip().lower()
+        if not search:
+            return queryset
+
+        # Case-insensitive prefix = one range of the username_key index (migration 0004)
+        return queryset.filter(username_key__gte=search, username_key__lt=search + "\U0010ffff")
+
+    def get_fields(self):
+        allowed = UserListSerializer.Meta.fields
+        requested = self.request.query_params.get("fields")
+        if not requested:
+            return allowed
+
+        fields = [name for name in allowed if name in requested.split(",")]
+        if not fields:
+            raise ValidationError({"fields": f"Choose from: {', '.join(allowed)}"})
+        return fields
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault("fields", self.get_fields())
+        return super().get_serializer(*args, **kwargs)
 
 
 # ------------------------------
@@ -117,6 +149,29 @@ class MessageListCreatView(generics.ListCreateAPIView):
         return conversation
 
 
+# ------------------------------
+# 🔹 Export a conversation as NDJSON (streamed)
+# ------------------------------
+class MessageExportView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, conversation_id):
+        conversation = get_object_or_404(Conversation, id=conversation_id)
+        if request.user not in conversation.participants.all():
+            raise PermissionDenied("You are not a participant of this conversation")
+
+        # Each handler only streams its own kind of iterator and buffers the other one whole
+        queryset = export_queryset([conversation.id])
+        if isinstance(request._request, ASGIRequest):
+            lines = aexport_lines(queryset)
+        else:
+            lines = export_lines(queryset)
+
+        response = StreamingHttpResponse(lines, content_type="application/x-ndjson")
+        response["Content-Disposition"] = f'attachment; filename="conversation-{conversation.id}.ndjson"'
+        return response
+
+
 # ------------------------------
 # 🔹 Retrieve or Delete a Message
 # ------------------------------
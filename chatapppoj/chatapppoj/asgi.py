@@ -12,8 +12,11 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chatapppoj.settings')
 
 django.setup()  #  make sure Django apps are loaded before imports
 
+from chatapp import draining
 from chatapp.routing import websocket_urlpatterns  # import AFTER setup
 
+draining.install_signal_handler()  #  drain on DRAIN_SIGNAL from worker startup
+
 application = ProtocolTypeRouter({
     'http': get_asgi_application(),  #  call the function
     'websocket': AuthMiddlewareStack(
@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
+
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -75,14 +79,55 @@ TEMPLATES = [
 WSGI_APPLICATION = 'chatapppoj.wsgi.application'
 ASGI_APPLICATION = 'chatapppoj.asgi.application'
 
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels_redis.core.RedisChannelLayer',
-        'CONFIG': {
-            'hosts': [('127.0.0.1', 6379)],
+# Channel layer
+# CHANNEL_LAYER: 'redis' (default), 'pubsub' (Redis pub/sub fan-out) or 'memory' (single process only)
+# CHANNEL_REDIS_HOSTS: comma separated Redis URLs, one per shard. Groups and channels are
+# placed on a consistent hash ring over the hosts (chatapp.channel_layers), so adding a
+# shard only moves about 1/N of them and the order of the list does not matter; every
+# worker must still list the same shards (see "Scaling out" in the README).
+# For several workers on one host, point them at a local Redis over a unix socket
+# (e.g. unix:///run/redis/redis.sock).
+CHANNEL_LAYER = os.environ.get('CHANNEL_LAYER', 'redis')
+CHANNEL_REDIS_HOSTS = [
+    host.strip()
+    for host in os.environ.get('CHANNEL_REDIS_HOSTS', 'redis://127.0.0.1:6379').split(',')
+    if host.strip()
+]
+
+if CHANNEL_LAYER == 'memory':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
         },
-    },
-}
+    }
+elif CHANNEL_LAYER in ('redis', 'pubsub'):
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': {
+                'redis': 'chatapp.channel_layers.RingRedisChannelLayer',
+                'pubsub': 'chatapp.channel_layers.RingRedisPubSubChannelLayer',
+            }[CHANNEL_LAYER],
+            'CONFIG': {
+                'hosts': CHANNEL_REDIS_HOSTS,
+            },
+        },
+    }
+else:
+    raise ImproperlyConfigured(
+        f"CHANNEL_LAYER must be 'redis', 'pubsub' or 'memory', not {CHANNEL_LAYER!r}"
+    )
+
+# Graceful draining (kill -USR1 <daphne pid>)
+# The worker stops accepting sockets, flushes pending message writes, tells every client to
+# reconnect after a random delay up to DRAIN_RECONNECT_JITTER_MS and closes them with code 4002.
+# It exits once every socket has disconnected, or after DRAIN_CLOSE_TIMEOUT seconds.
+# Peers keep a handed-over user online for PRESENCE_HANDOVER_GRACE_MS instead of flapping offline.
+DRAIN_SIGNAL = 'SIGUSR1'
+DRAIN_RECONNECT_JITTER_MS = 5000
+DRAIN_FLUSH_TIMEOUT = 10
+DRAIN_CLOSE_TIMEOUT = 10
+DRAIN_EXIT = True
+PRESENCE_HANDOVER_GRACE_MS = 15000
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
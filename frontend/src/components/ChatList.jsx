@@ -8,6 +8,8 @@ import { ACCESS_TOKEN } from "../token";
 const ChatList = () => {
   const [conversations, setConversations] = useState([]);
   const [users, setUsers] = useState([]);
+  const [userSearch, setUserSearch] = useState("");
+  const [nextUsersUrl, setNextUsersUrl] = useState(null);
   const [selectedUser, setSelectedUser] = useState(null);
   const [currentUserId, setCurrentUserId] = useState(null);
   const [activeConversation, setActiveConversation] = useState(null);
@@ -22,9 +24,6 @@ const ChatList = () => {
           setCurrentUserId(decodedToken.user_id);
         }
 
-        const userResponse = await api.get("users/");
-        setUsers(userResponse.data);
-
         const conversationResponse = await api.get("conversations/");
         setConversations(conversationResponse.data);
       } catch (error) {
@@ -35,6 +34,38 @@ const ChatList = () => {
     initializeData();
   }, []);
 
+  // Typeahead: search the user directory as the user types (debounced)
+  useEffect(() => {
+    let cancelled = false;
+    const timeout = setTimeout(async () => {
+      try {
+        const response = await api.get("users/", { params: { search: userSearch } });
+        // Ignore responses for a search the user has already typed past
+        if (cancelled) return;
+        setUsers(response.data.results);
+        setNextUsersUrl(response.data.next);
+      } catch (error) {
+        console.error("Error searching users:", error);
+      }
+    }, 250);
+
+    return () => {
+      cancelled = true;
+      clearTimeout(timeout);
+    };
+  }, [userSearch]);
+
+  const handleLoadMoreUsers = async () => {
+    if (!nextUsersUrl) return;
+    try {
+      const response = await api.get(nextUsersUrl);
+      setUsers((prevUsers) => [...prevUsers, ...response.data.results]);
+      setNextUsersUrl(response.data.next);
+    } catch (error) {
+      console.error("Error loading more users:", error);
+    }
+  };
+
   const handleStartConversation = async () => {
     if (selectedUser && currentUserId) {
       const participants = [selectedUser, currentUserId];
@@ -69,6 +100,12 @@ const ChatList = () => {
           <p>Connect with your friends instantly!</p>
         </header>
         <div className="user-selector">
+          <input
+            type="text"
+            value={userSearch}
+            onChange={(e) => setUserSearch(e.target.value)}
+            placeholder="Search users..."
+          />
           <select onChange={(e) => setSelectedUser(e.target.value)} value={selectedUser || ""}>
             <option value="" disabled>
               Select a user to chat with
@@ -79,6 +116,9 @@ const ChatList = () => {
               </option>
             ))}
           </select>
+          {nextUsersUrl && (
+            <button onClick={handleLoadMoreUsers}>Load more users</button>
+          )}
           <button onClick={handleStartConversation}>Start Conversation</button>
           {errorMessage && <p className="error-message">{errorMessage}</p>}
         </div>
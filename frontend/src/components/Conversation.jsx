@@ -3,6 +3,9 @@ import api from "../api";
 import "../styles/Conversation.css";
 import { ACCESS_TOKEN } from "../token";
 
+// Close code sent by a draining server worker: reconnect after the hinted delay
+const DRAIN_CLOSE_CODE = 4002;
+
 const Conversation = ({ conversationId, currentUserId, onBack }) => {
   const [messages, setMessages] = useState([]);
   const [newMessage, setNewMessage] = useState("");
@@ -12,6 +15,9 @@ const Conversation = ({ conversationId, currentUserId, onBack }) => {
   const [socket, setSocket] = useState(null);
   const [chatPartner, setChatPartner] = useState(null);
   const typingTimeoutRef = useRef(null);
+  const reconnectDelayRef = useRef(0);
+  const reconnectTimeoutRef = useRef(null);
+  const offlineTimeoutsRef = useRef({});
 
   useEffect(() => {
     const fetchConversationData = async () => {
@@ -48,66 +54,108 @@ const Conversation = ({ conversationId, currentUserId, onBack }) => {
 
   useEffect(() => {
     if (!conversationId) return;
-    const token = localStorage.getItem(ACCESS_TOKEN);
+    let websocket = null;
+    let closedByUser = false;
+
+    const markOnline = (users) => {
+      users.forEach((user) => {
+        clearTimeout(offlineTimeoutsRef.current[user.id]);
+        delete offlineTimeoutsRef.current[user.id];
+      });
+      setOnlineUsers((prev) => [
+        ...prev.filter((user) => !users.some((u) => u.id === user.id)),
+        ...users,
+      ]);
+    };
 
-    const websocket = new WebSocket(`ws://localhost:8000/ws/chat/${conversationId}/?token=${token}`);
+    const markOffline = (users) => {
+      setOnlineUsers((prev) =>
+        prev.filter((user) => !users.some((u) => u.id === user.id))
+      );
+    };
 
+    const connect = () => {
+      const token = localStorage.getItem(ACCESS_TOKEN);
 
-    websocket.onopen = () => {
-      console.log("WebSocket connection established");
-    };
+      websocket = new WebSocket(`ws://localhost:8000/ws/chat/${conversationId}/?token=${token}`);
 
-    websocket.onmessage = (event) => {
-      try {
-        const data = JSON.parse(event.data);
-
-        if (data.type === "chat_message") {
-          const { message, user, timestamp } = data;
-          setMessages((prevMessages) => [
-            ...prevMessages,
-            { sender: user, content: message, timestamp },
-          ]);
-          setTypingUser(null);
-        } else if (data.type === "typing") {
-          const { user, receiver } = data;
-
-          if (typingTimeoutRef.current) {
-            clearTimeout(typingTimeoutRef.current);
-          }
 
-          // Only show typing indicator if the current user is the receiver
-          if (receiver === currentUserId && user.id !== currentUserId) {
-            setTypingUser(user);
-            // Set new timeout and store the reference
-            typingTimeoutRef.current = setTimeout(() => {
-              setTypingUser(null);
-              typingTimeoutRef.current = null;
-            }, 2000);
-          }
-        } else if (data.type === "online_status") {
-          if (data.status === "online") {
-            setOnlineUsers((prev) => [...prev, ...data.online_users]);
-          } else if (data.status === "offline") {
-            setOnlineUsers((prev) =>
-              prev.filter((user) => !data.online_users.some((u) => u.id === user.id))
-            );
+      websocket.onopen = () => {
+        console.log("WebSocket connection established");
+      };
+
+      websocket.onmessage = (event) => {
+        try {
+          const data = JSON.parse(event.data);
+
+          if (data.type === "chat_message") {
+            const { message, user, timestamp } = data;
+            setMessages((prevMessages) => [
+              ...prevMessages,
+              { sender: user, content: message, timestamp },
+            ]);
+            setTypingUser(null);
+          } else if (data.type === "typing") {
+            const { user, receiver } = data;
+
+            if (typingTimeoutRef.current) {
+              clearTimeout(typingTimeoutRef.current);
+            }
+
+            // Only show typing indicator if the current user is the receiver
+            if (receiver === currentUserId && user.id !== currentUserId) {
+              setTypingUser(user);
+              // Set new timeout and store the reference
+              typingTimeoutRef.current = setTimeout(() => {
+                setTypingUser(null);
+                typingTimeoutRef.current = null;
+              }, 2000);
+            }
+          } else if (data.type === "online_status") {
+            if (data.status === "online") {
+              markOnline(data.online_users);
+            } else if (data.status === "offline") {
+              markOffline(data.online_users);
+            } else if (data.status === "reconnecting") {
+              // Peer is moving to another server: only drop it if it doesn't come back in time
+              data.online_users.forEach((user) => {
+                clearTimeout(offlineTimeoutsRef.current[user.id]);
+                offlineTimeoutsRef.current[user.id] = setTimeout(() => {
+                  delete offlineTimeoutsRef.current[user.id];
+                  markOffline([user]);
+                }, data.grace_ms);
+              });
+            }
+          } else if (data.type === "reconnect") {
+            reconnectDelayRef.current = data.delay_ms;
           }
+        } catch (error) {
+          console.error("Error parsing WebSocket message:", error);
         }
-      } catch (error) {
-        console.error("Error parsing WebSocket message:", error);
-      }
-    };
+      };
+
+      websocket.onerror = (error) => {
+        console.error("WebSocket Error:", error);
+      };
+
+      websocket.onclose = (event) => {
+        if (!closedByUser && event.code === DRAIN_CLOSE_CODE) {
+          reconnectTimeoutRef.current = setTimeout(connect, reconnectDelayRef.current);
+        }
+      };
 
-    websocket.onerror = (error) => {
-      console.error("WebSocket Error:", error);
+      setSocket(websocket);
     };
 
-    setSocket(websocket);
+    connect();
 
     return () => {
+      closedByUser = true;
       if (typingTimeoutRef.current) {
         clearTimeout(typingTimeoutRef.current);
       }
+      clearTimeout(reconnectTimeoutRef.current);
+      Object.values(offlineTimeoutsRef.current).forEach(clearTimeout);
       websocket.close();
     };
   }, []);